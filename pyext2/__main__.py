@@ -34,7 +34,7 @@ def main() -> Ext2Reader:
     }[args.verbose]
 
     if logging_level:
-        logging.basicConfig(level=logging.DEBUG)
+        logging.basicConfig(level=logging_level)
 
     reader = Ext2Reader(args.file)
 
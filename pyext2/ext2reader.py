@@ -1,16 +1,22 @@
 from __future__ import annotations
 
-import math
+import mmap
+import os
 import struct
 from pathlib import Path
 
-from typing import BinaryIO, Any, Optional
-
-from bitarray import bitarray
+from typing import Any, Iterable, Iterator, Optional
 
 from .inode import Inode, DirEntry
 from .parser import SuperBlockInfo, BlockGroupDescriptionInfo
 
+_DIRENT_HDR = struct.Struct("<IHBB")
+
+# names like "." and ".." repeat in every directory, equal names share one bytes object;
+# cleared once it grows too big so it stays bounded
+_interned_names: dict[bytes, bytes] = {}
+_INTERNED_NAMES_MAX_SIZE = 65536
+
 
 class SuperBlock:
     EXT2_BAD_INO = 1
@@ -22,15 +28,16 @@ class SuperBlock:
 
         self.blocks_count = info.s_blocks_count
         self.blocks_per_group = info.s_blocks_per_group
+        self.first_data_block = info.s_first_data_block
 
         self.log_block_size = info.s_log_block_size
         self.inode_size = info.s_inode_size
         self.block_size = 1024 << self.log_block_size
-        self.inodes_per_block = int(self.block_size / self.inode_size)
+        self.inodes_per_block = self.block_size // self.inode_size
         self.inodes_per_group = info.s_inodes_per_group
-        self.inode_table_size = int(info.s_inodes_per_group / self.inodes_per_block)
+        self.inode_table_size = info.s_inodes_per_group // self.inodes_per_block
 
-        self.nb_block_groups = int(math.ceil(self.blocks_count / self.blocks_per_group))
+        self.nb_block_groups = -(-self.blocks_count // self.blocks_per_group)
 
         self.first_inode = info.s_first_ino
 
@@ -44,27 +51,51 @@ class BlockGroupDescription:
 
 
 class BlockBitmap:
+    __slots__ = ("data",)
+
     def __init__(self, data: bytes):
-        self.data = bitarray(endian="little")
-        self.data.frombytes(data)
+        self.data = data
 
-    def __getitem__(self, idx: int | slice) -> Any:
-        return self.data[idx]
+    def __getitem__(self, idx: int) -> int:
+        # bits are stored little endian within each byte
+        return (self.data[idx >> 3] >> (idx & 7)) & 1
 
     def __len__(self) -> int:
-        return len(self.data)
+        return len(self.data) * 8
 
 
 class InodeBitmap:
+    __slots__ = ("data",)
+
     def __init__(self, data: bytes):
-        self.data = bitarray(endian="little")
-        self.data.frombytes(data)
+        self.data = data
 
-    def __getitem__(self, idx: int | slice) -> Any:
-        return self.data[idx]
+    def __getitem__(self, idx: int) -> int:
+        # bits are stored little endian within each byte
+        return (self.data[idx >> 3] >> (idx & 7)) & 1
 
     def __len__(self) -> int:
-        return len(self.data)
+        return len(self.data) * 8
+
+
+# yields (first block, number of blocks) for each run of consecutive block numbers, up to the
+# first unused (0) block pointer
+def _block_runs(blocks: Iterable[int]) -> Iterator[tuple[int, int]]:
+    first_block = nb_blocks = 0
+    for b in blocks:
+        if b == 0:
+            break
+
+        if nb_blocks and b == first_block + nb_blocks:
+            nb_blocks += 1
+            continue
+
+        if nb_blocks:
+            yield first_block, nb_blocks
+        first_block, nb_blocks = b, 1
+
+    if nb_blocks:
+        yield first_block, nb_blocks
 
 
 # 1. load first superblock
@@ -72,97 +103,150 @@ class InodeBitmap:
 
 
 class Group:
-    def __init__(
-        self, superblock: SuperBlock, group_desc: BlockGroupDescription, ext_file: BinaryIO
-    ):
+    def __init__(self, superblock: SuperBlock, group_desc: BlockGroupDescription, image: mmap.mmap):
         self.superblock = superblock
         self.group_desc = group_desc
+        self.image = image
 
         self.block_size = block_size = superblock.block_size
         block_bitmap_offset = group_desc.block_bitmap_id * block_size
         inode_bitmap_offset = group_desc.inode_bitmap_id * block_size
 
-        ext_file.seek(block_bitmap_offset)
-        self.block_bitmap = BlockBitmap(ext_file.read(block_size))
+        self.inode_table_offset = group_desc.inode_table_id * block_size
+
+        # only the bytes covering the group are kept, the rest of the block is padding;
+        # the single group stops at the last block of the image, not at blocks_per_group
+        group_blocks = min(
+            superblock.blocks_per_group, superblock.blocks_count - superblock.first_data_block
+        )
+        block_bitmap_size = min(block_size, -(-group_blocks // 8))
+        inode_bitmap_size = min(block_size, -(-superblock.inodes_per_group // 8))
+
+        self.block_bitmap = BlockBitmap(
+            image[block_bitmap_offset : block_bitmap_offset + block_bitmap_size]
+        )
+        self.inode_bitmap = InodeBitmap(
+            image[inode_bitmap_offset : inode_bitmap_offset + inode_bitmap_size]
+        )
+
+        # inodes are parsed on first access (see `get_inode`), commands only touch a few of them
+        self._inode_cache: dict[int, Inode] = {}
+
+    def get_inode(self, inode_index: int) -> Inode:
+        inode = self._inode_cache.get(inode_index)
+        if inode is not None:
+            return inode
 
-        ext_file.seek(inode_bitmap_offset)
-        self.inode_bitmap = InodeBitmap(ext_file.read(block_size))
+        superblock = self.superblock
 
-        inode_table_offset = group_desc.inode_table_id * block_size
-        inode_size = superblock.inode_size
+        # reserved inodes (all below `first_inode` except the root) are never reached through
+        # a directory, so they're only parsed when asked for explicitly and never walked
+        is_reserved = (
+            inode_index != SuperBlock.EXT2_ROOT_INO and inode_index < superblock.first_inode
+        )
 
-        inode_blocks_per_group = superblock.inodes_per_group // superblock.inode_table_size
+        # bits past `inodes_per_group` are padding (set to 1 by mkfs), don't look at them
+        if (
+            not 0 < inode_index <= superblock.inodes_per_group
+            or not self.inode_bitmap[inode_index - 1]
+        ):
+            raise KeyError(f"inode {inode_index} is not allocated")
 
-        self.inode_table: dict[int, Inode] = {}
-        for i in range(inode_blocks_per_group):
-            ith_block = inode_table_offset + block_size * i
+        inode_offset = self.inode_table_offset + (inode_index - 1) * superblock.inode_size
+        # parsed in place from the mapped inode table, without copying the record out first
+        inode = Inode(self.image, superblock.log_block_size, inode_offset)
 
-            for j in range(superblock.inode_table_size):
-                inode_index = i * superblock.inode_table_size + j + 1
+        if not is_reserved and inode.is_dir:
+            inode.set_files(self._read_dir_entries(inode))
 
-                if not self.inode_bitmap[inode_index - 1]:
-                    continue
+        self._inode_cache[inode_index] = inode
+        return inode
 
-                inode_offset = ith_block + j * inode_size
-                ext_file.seek(inode_offset)
-                inode = Inode(ext_file.read(inode_size), superblock.log_block_size)
+    def _read_dir_entries(self, inode: Inode) -> dict[bytes, DirEntry]:
+        # hoisted out of the loops below, attribute/global lookups add up per entry
+        block_size = self.block_size
+        image = self.image
+        unpack_header = _DIRENT_HDR.unpack_from
+        dir_entry = DirEntry
+        intern_name = _interned_names.setdefault
+        files: dict[bytes, DirEntry] = {}
+
+        if len(_interned_names) > _INTERNED_NAMES_MAX_SIZE:
+            _interned_names.clear()
+
+        # indirect blocks are not supported yet
+        for b in inode.block[: Inode.EXT2_NDIR_BLOCKS]:
+            if b == 0:
+                continue
+
+            # entries are unpacked straight from the mapped image, only the names are copied
+            position = b * block_size
+            block_end = position + block_size
+            while position < block_end:
+                index, size, name_len, inode_type = unpack_header(image, position)
+                # a record can't be shorter than its header, the block is corrupted
+                if size < 8:
+                    break
 
-                if inode_index != SuperBlock.EXT2_ROOT_INO and inode_index < superblock.first_inode:
-                    self.inode_table[inode_index] = inode
-                    continue
+                # unused (e.g. deleted) entries have inode 0, but `size` still points to the
+                # next entry in the block
+                if index != 0:
+                    # names are kept as raw bytes, they are only decoded for display
+                    name = image[position + 8 : position + 8 + name_len]
+                    files[intern_name(name, name)] = dir_entry(index, inode_type)
 
-                if inode.is_dir:
-                    for b in inode.block:
-                        if b == 0:
-                            continue
+                position += size
 
-                        offset = b * block_size
-                        files: dict[str, DirEntry] = {}
-                        while True:
-                            ext_file.seek(offset)
-                            (index, size, name_len, inode_type) = struct.unpack(
-                                "IHbb", ext_file.read(8)
-                            )
-                            if index == 0:
-                                break
+        return files
 
-                            name = struct.unpack(f"{name_len}s", ext_file.read(name_len))[0]
-                            offset += size
 
-                            entry = DirEntry(index, inode_type)
+class Ext2Reader:
+    def __init__(self, file_path: str | Path):
+        self.ext2_file_path = file_path
 
-                            files[name.decode()] = entry
+        fd = os.open(file_path, os.O_RDONLY | os.O_CLOEXEC)
 
-                            # size cannot be greater than 8 (header of dir entry)
-                            #   + 255 (max name length)
-                            if size > 255 + 8 + 1:
-                                break
+        # the whole image is mapped read-only, every read is a slice served from the page cache
+        # without seeking or syscalls and there is no shared file offset between threads;
+        # the mapping keeps its own duplicate of the fd, so ours isn't needed past this point
+        try:
+            self._mm = image = mmap.mmap(fd, 0, prot=mmap.PROT_READ)
+        finally:
+            os.close(fd)
 
-                    inode.set_files(files)
+        # slicing the view doesn't copy, file data goes from the mapping straight into its buffer
+        self._view = memoryview(image)
 
-                self.inode_table[inode_index] = inode
+        self.superblock = SuperBlock(image[1024:2048])
 
+        assert self.superblock.nb_block_groups == 1
 
-class Ext2Reader:
-    def __init__(self, file_path: str | Path):
-        self.ext2_file_path = file_path
+        self.block_size = block_size = self.superblock.block_size
+
+        self.group_description_table = []
+        for i in range(self.superblock.nb_block_groups):
+            offset = block_size + i * 32
+            self.group_description_table.append(BlockGroupDescription(image[offset : offset + 32]))
 
-        with open(file_path, "rb") as ext_file:
-            ext_file.seek(1024)
-            self.superblock = SuperBlock(ext_file.read(1024))
+        # XXX: this needs to be fixed if we want to support more than one group
+        self.first_group = Group(self.superblock, self.group_description_table[0], image)
+        self.root_inode = self.first_group.get_inode(SuperBlock.EXT2_ROOT_INO)
 
-            assert self.superblock.nb_block_groups == 1
+        # (path relative to the root, follow_links) -> inode, the image is read-only so entries
+        # never need to be invalidated
+        self._path_cache: dict[tuple[str, bool], Inode] = {}
 
-            self.block_size = block_size = self.superblock.block_size
+    def close(self) -> None:
+        if not self._mm.closed:
+            # the mapping can't be closed while a view of it exists
+            self._view.release()
+            self._mm.close()
 
-            self.group_description_table = []
-            ext_file.seek(block_size)
-            for _ in range(self.superblock.nb_block_groups):
-                self.group_description_table.append(BlockGroupDescription(ext_file.read(32)))
+    def __enter__(self) -> Ext2Reader:
+        return self
 
-            # XXX: this needs to be fixed if we want to support more than one group
-            self.first_group = Group(self.superblock, self.group_description_table[0], ext_file)
-            self.root_inode = self.first_group.inode_table[SuperBlock.EXT2_ROOT_INO]
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
 
     def _find_inode_for_path(self, inode: Inode, path: str, *, follow_links: bool = False) -> Inode:
         if path.startswith("/"):
@@ -174,10 +258,30 @@ class Ext2Reader:
         if path_parts[0] == "":
             return inode
 
-        for path_part in path_parts:
-            assert path_part in inode.files.keys(), f"{path_part = } {inode.files.keys() = }"
+        # only lookups starting at the root are cached, symlinks are resolved relative to
+        # their parent directory
+        use_cache = inode is self.root_inode
+        start = 0
+
+        if use_cache:
+            # resume from the longest already resolved prefix of the path
+            for start in range(len(path_parts), 0, -1):
+                cached_inode = self._path_cache.get(("/".join(path_parts[:start]), follow_links))
+                if cached_inode is not None:
+                    if start == len(path_parts):
+                        return cached_inode
+
+                    inode = cached_inode
+                    break
+            else:
+                start = 0
+
+        for i in range(start, len(path_parts)):
+            path_part = path_parts[i]
+            entry = inode.files.get(path_part.encode(errors="surrogateescape"))
+            assert entry is not None, f"{path_part = } {inode.files.keys() = }"
             parent_inode = inode
-            inode = self.first_group.inode_table[inode.files[path_part].index]
+            inode = self.first_group.get_inode(entry.index)
 
             if inode.is_link and follow_links:
                 link_path = inode.get_link_path()
@@ -185,23 +289,28 @@ class Ext2Reader:
                     parent_inode, link_path, follow_links=follow_links
                 )
 
+            if use_cache:
+                self._path_cache["/".join(path_parts[: i + 1]), follow_links] = inode
+
         return inode
 
-    def _read_data_for_inode(self, inode: Inode) -> bytes:
+    def _read_data_for_inode(self, inode: Inode) -> bytearray:
+        block_size = self.block_size
+        image = self._view
         remaining_size = inode.size
-        data = bytes()
-
-        assert remaining_size <= self.block_size
+        data = bytearray(inode.size)
+        position = 0
 
-        with open(self.ext2_file_path, "rb") as ext_file:
-            for b in inode.block:
-                if b == 0:
-                    break
+        # indirect blocks are not supported yet
+        assert remaining_size <= Inode.EXT2_NDIR_BLOCKS * block_size
 
-                ext_file.seek(self.block_size * b)
-                size_to_read = min(remaining_size, self.block_size)
-                remaining_size -= size_to_read
-                data += ext_file.read(size_to_read)
+        # consecutive blocks are copied with a single slice, straight from the mapping
+        for first_block, nb_blocks in _block_runs(inode.block[: Inode.EXT2_NDIR_BLOCKS]):
+            size_to_read = min(remaining_size, nb_blocks * block_size)
+            remaining_size -= size_to_read
+            offset = block_size * first_block
+            data[position : position + size_to_read] = image[offset : offset + size_to_read]
+            position += size_to_read
 
         return data
 
@@ -209,7 +318,7 @@ class Ext2Reader:
         inode = self._find_inode_for_path(self.root_inode, path, follow_links=True)
         assert not inode.is_file, "Can only `ls` directory inodes"
 
-        print(list(inode.files.keys()))
+        print([name.decode(errors="surrogateescape") for name in inode.files.keys()])
 
     def cat_command(self, path: str) -> None:
         inode = self._find_inode_for_path(self.root_inode, path, follow_links=True)
@@ -227,6 +336,6 @@ class Ext2Reader:
             inode = self._find_inode_for_path(self.root_inode, path, follow_links=follow_links)
         else:
             assert index is not None
-            inode = self.first_group.inode_table[index]
+            inode = self.first_group.get_inode(index)
 
         print(inode)
@@ -1,14 +1,17 @@
 from __future__ import annotations
 
+import array
 from dataclasses import dataclass
 import enum
-import struct
+import sys
 
-from .parser import InodeInfo
+from .parser import Buffer, InodeInfo
 
 
 @dataclass
 class DirEntry:
+    __slots__ = ("index", "inode_type")
+
     index: int
     inode_type: int
 
@@ -57,13 +60,35 @@ class InodeFlags(enum.IntFlag):
 
 
 class Inode:
-    def __init__(self, data: bytes, log_block_size: int):
-        info = InodeInfo(data)
-
-        self.mode = InodeMode(info.i_mode)
-        self.flags = InodeFlags(info.i_flags)
-
-        self.block_index = int(info.i_blocks / (1 << log_block_size))
+    __slots__ = (
+        "_mode",
+        "_flags",
+        "block_index",
+        "size",
+        "uid",
+        "gid",
+        "links_count",
+        "blocks",
+        "block",
+        "files",
+    )
+
+    EXT2_NDIR_BLOCKS = 12
+
+    # plain ints, looking members up on the enum in every `is_*` call isn't free
+    _IFMT = int(InodeMode.EXT2_S_IFMT)
+    _IFREG = int(InodeMode.EXT2_S_IFREG)
+    _IFDIR = int(InodeMode.EXT2_S_IFDIR)
+    _IFLNK = int(InodeMode.EXT2_S_IFLNK)
+
+    def __init__(self, data: Buffer, log_block_size: int, offset: int = 0):
+        info = InodeInfo(data, offset)
+
+        # kept as plain ints, the enums are only built for display (see `mode` and `flags`)
+        self._mode: int = info.i_mode
+        self._flags: int = info.i_flags
+
+        self.block_index = info.i_blocks >> log_block_size
 
         self.size = info.i_size
         self.uid = info.i_uid
@@ -73,9 +98,9 @@ class Inode:
         self.blocks = info.i_blocks
         self.block = info.i_block
 
-        self.files: dict[str, DirEntry] = {}
+        self.files: dict[bytes, DirEntry] = {}
 
-    def set_files(self, files: dict[str, DirEntry]) -> None:
+    def set_files(self, files: dict[bytes, DirEntry]) -> None:
         self.files = files
 
     def __repr__(self) -> str:
@@ -104,27 +129,52 @@ class Inode:
         if self.is_dir and self.files:
             lines.append("files:")
             for entry_name, entry_info in self.files.items():
-                lines.append(f"  {entry_name!r}    \t{entry_info}")
+                name = entry_name.decode(errors="surrogateescape")
+                lines.append(f"  {name!r}    \t{entry_info}")
 
         if self.is_link:
-            lines.append(f"soft link pointing to {self.get_link_path()!r}")
+            if self.is_fast_link:
+                lines.append(f"soft link pointing to {self.get_link_path()!r}")
+            else:
+                lines.append(f"slow soft link, target stored in block {self.block[0]}")
 
         return "\n  ".join(lines)
 
     def get_link_path(self) -> str:
         assert self.is_link
 
-        block_as_bytes = struct.pack("15i", *self.block)
-        return block_as_bytes[: block_as_bytes.index(0)].decode()
+        # `size` is the length of the target so there's no need to search for the terminator
+        assert self.is_fast_link, "only fast symlinks are supported"
+
+        # the pointers were swapped to native order, the target is the on-disk little-endian bytes
+        raw = self.block
+        if sys.byteorder == "big":
+            raw = array.array(raw.typecode, raw)
+            raw.byteswap()
+
+        return raw.tobytes()[: self.size].decode()
+
+    @property
+    def mode(self) -> InodeMode:
+        return InodeMode(self._mode)
+
+    @property
+    def flags(self) -> InodeFlags:
+        return InodeFlags(self._flags)
 
     @property
     def is_file(self) -> bool:
-        return self.mode & InodeMode.EXT2_S_IFMT == InodeMode.EXT2_S_IFREG
+        return self._mode & self._IFMT == self._IFREG
 
     @property
     def is_dir(self) -> bool:
-        return self.mode & InodeMode.EXT2_S_IFMT == InodeMode.EXT2_S_IFDIR
+        return self._mode & self._IFMT == self._IFDIR
 
     @property
     def is_link(self) -> bool:
-        return self.mode & InodeMode.EXT2_S_IFMT == InodeMode.EXT2_S_IFLNK
+        return self._mode & self._IFMT == self._IFLNK
+
+    @property
+    def is_fast_link(self) -> bool:
+        # targets shorter than the block pointers area are stored inline ("fast" symlinks)
+        return self.is_link and self.size < len(self.block) * self.block.itemsize
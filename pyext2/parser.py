@@ -1,158 +1,223 @@
+import array
+import mmap
 import struct
+import sys
+from typing import Union
 
+# anything struct can unpack from
+Buffer = Union[bytes, memoryview, mmap.mmap]
 
-class _Parser:
-    def __init__(self, buffer: bytes, size: int):
-        assert size == len(buffer), f"expected buffer of size {size}, was {len(buffer)}"
-        self.buffer = buffer
-        self.offset = 0
-
-    def _read(self, format_string: str, size: int) -> tuple:
-        data = struct.unpack(format_string, self.buffer[self.offset : self.offset + size])
-        self.offset += size
-        return data
-
-    def read_u(self) -> int:
-        data = self._read("I", 4)  # type: tuple[int, ...]
-        assert isinstance(data, tuple) and len(data) == 1
-        return data[0]
-
-    def read_us(self, *, count: int = 1) -> tuple[int, ...]:
-        return self._read(f"{count}I", 4 * count)
-
-    def read_i(self) -> int:
-        data = self._read("i", 4)  # type: tuple[int, ...]
-        assert isinstance(data, tuple) and len(data) == 1
-        return data[0]
-
-    def read_is(self, *, count: int = 1) -> tuple[int, ...]:
-        return self._read(f"{count}i", 4 * count)
 
-    def read_s(self) -> int:
-        data = self._read("h", 2)  # type: tuple[int, ...]
-        assert isinstance(data, tuple) and len(data) == 1
-        return data[0]
-
-    def read_ss(self, *, count: int = 1) -> tuple[int, ...]:
-        return self._read(f"{count}h", 2 * count)
+# attributes live in slots instead of a per instance __dict__, there's one instance per record
+class _Parser:
+    __slots__ = ()
 
-    def read_b(self) -> int:
-        data = self._read("b", 1)  # type: tuple[int, ...]
-        assert isinstance(data, tuple) and len(data) == 1
-        return data[0]
+    def __init__(self, buffer: Buffer, size: int, offset: int = 0):
+        # records can be parsed in place from a larger buffer (e.g. the whole inode table)
+        assert offset + size <= len(buffer), f"expected {size} bytes at {offset}, was {len(buffer)}"
 
-    def read_bs(self, *, count: int = 1) -> tuple[int, ...]:
-        return self._read(f"{count}b", 1 * count)
 
-    def read_string(self, length: int) -> bytes:
-        # vvv make mypy happy
-        data = self._read(f"{length}s", length)  # type: tuple[bytes, ...]
+# fixed layout records are decoded with a single unpack_from call
+_SUPERBLOCK_STRUCT = struct.Struct(
+    "<"
+    "13I6h4I2h"
+    "I2h3I16s16s64sI"  # EXT2_DYNAMIC_REV Specific
+    "2b2x"  # Performance Hints
+    "16s3I"  # Journaling Support
+    "4Ib3x"  # Directory Indexing Support
+    "2I"  # Other options
+)
 
-        assert isinstance(data, tuple) and len(data) == 1
+_BLOCK_GROUP_DESCRIPTION_STRUCT = struct.Struct("<3I3h")
 
-        return data[0]
+_INODE_STRUCT = struct.Struct("<Hh5I2h3I60s4I12s")
 
 
 class SuperBlockInfo(_Parser):
+    __slots__ = (
+        "s_inodes_count",
+        "s_blocks_count",
+        "s_r_blocks_count",
+        "s_free_blocks_count",
+        "s_free_inodes_count",
+        "s_first_data_block",
+        "s_log_block_size",
+        "s_log_frag_size",
+        "s_blocks_per_group",
+        "s_frags_per_group",
+        "s_inodes_per_group",
+        "s_mtime",
+        "s_wtime",
+        "s_mnt_count",
+        "s_max_mnt_count",
+        "s_magic",
+        "s_state",
+        "s_errors",
+        "s_minor_rev_level",
+        "s_lastcheck",
+        "s_checkinterval",
+        "s_creator_os",
+        "s_rev_level",
+        "s_def_resuid",
+        "s_def_resgid",
+        "s_first_ino",
+        "s_inode_size",
+        "s_block_group_nr",
+        "s_feature_compat",
+        "s_feature_incompat",
+        "s_feature_ro_compat",
+        "s_uuid",
+        "s_volume_name",
+        "s_last_mounted",
+        "s_algo_bitmap",
+        "s_prealloc_blocks",
+        "s_prealloc_dir_blocks",
+        "s_journal_uuid",
+        "s_journal_inum",
+        "s_journal_dev",
+        "s_last_orphan",
+        "s_def_hash_version",
+        "s_default_mount_options",
+        "s_first_meta_bg",
+        "s_hash_seed",
+    )
+
     __size__ = 1024
 
     def __init__(self, buffer: bytes):
         super().__init__(buffer, SuperBlockInfo.__size__)
 
-        self.s_inodes_count = self.read_u()
-        self.s_blocks_count = self.read_u()
-        self.s_r_blocks_count = self.read_u()
-        self.s_free_blocks_count = self.read_u()
-        self.s_free_inodes_count = self.read_u()
-        self.s_first_data_block = self.read_u()
-        self.s_log_block_size = self.read_u()
-        self.s_log_frag_size = self.read_u()
-        self.s_blocks_per_group = self.read_u()
-        self.s_frags_per_group = self.read_u()
-        self.s_inodes_per_group = self.read_u()
-        self.s_mtime = self.read_u()
-        self.s_wtime = self.read_u()
-        self.s_mnt_count = self.read_s()
-        self.s_max_mnt_count = self.read_s()
-        self.s_magic = self.read_s()
-        self.s_state = self.read_s()
-        self.s_errors = self.read_s()
-        self.s_minor_rev_level = self.read_s()
-        self.s_lastcheck = self.read_u()
-        self.s_checkinterval = self.read_u()
-        self.s_creator_os = self.read_u()
-        self.s_rev_level = self.read_u()
-        self.s_def_resuid = self.read_s()
-        self.s_def_resgid = self.read_s()
-
-        # EXT2_DYNAMIC_REV Specific
-        self.s_first_ino = self.read_u()
-        self.s_inode_size = self.read_s()
-        self.s_block_group_nr = self.read_s()
-        self.s_feature_compat = self.read_u()
-        self.s_feature_incompat = self.read_u()
-        self.s_feature_ro_compat = self.read_u()
-        self.s_uuid = self.read_bs(count=16)
-        self.s_volume_name = self.read_string(length=16)
-        self.s_last_mounted = self.read_string(length=64)
-        self.s_algo_bitmap = self.read_u()
-
-        # Performance Hints
-        self.s_prealloc_blocks = self.read_b()
-        self.s_prealloc_dir_blocks = self.read_b()
-        self.read_bs(count=2)  # alignment
-
-        # Journaling Support
-        self.s_journal_uuid = self.read_bs(count=16)
-        self.s_journal_inum = self.read_u()
-        self.s_journal_dev = self.read_u()
-        self.s_last_orphan = self.read_u()
-
-        # Directory Indexing Support
-        self.s_hash_seed = self.read_us(count=4)
-        self.s_def_hash_version = self.read_b()
-        self.read_bs(count=3)  # padding
-
-        # Other options
-        self.s_default_mount_options = self.read_u()
-        self.s_first_meta_bg = self.read_u()
+        (
+            self.s_inodes_count,
+            self.s_blocks_count,
+            self.s_r_blocks_count,
+            self.s_free_blocks_count,
+            self.s_free_inodes_count,
+            self.s_first_data_block,
+            self.s_log_block_size,
+            self.s_log_frag_size,
+            self.s_blocks_per_group,
+            self.s_frags_per_group,
+            self.s_inodes_per_group,
+            self.s_mtime,
+            self.s_wtime,
+            self.s_mnt_count,
+            self.s_max_mnt_count,
+            self.s_magic,
+            self.s_state,
+            self.s_errors,
+            self.s_minor_rev_level,
+            self.s_lastcheck,
+            self.s_checkinterval,
+            self.s_creator_os,
+            self.s_rev_level,
+            self.s_def_resuid,
+            self.s_def_resgid,
+            # EXT2_DYNAMIC_REV Specific
+            self.s_first_ino,
+            self.s_inode_size,
+            self.s_block_group_nr,
+            self.s_feature_compat,
+            self.s_feature_incompat,
+            self.s_feature_ro_compat,
+            self.s_uuid,
+            self.s_volume_name,
+            self.s_last_mounted,
+            self.s_algo_bitmap,
+            # Performance Hints
+            self.s_prealloc_blocks,
+            self.s_prealloc_dir_blocks,
+            # Journaling Support
+            self.s_journal_uuid,
+            self.s_journal_inum,
+            self.s_journal_dev,
+            self.s_last_orphan,
+            # Directory Indexing Support
+            *hash_seed,
+            self.s_def_hash_version,
+            # Other options
+            self.s_default_mount_options,
+            self.s_first_meta_bg,
+        ) = _SUPERBLOCK_STRUCT.unpack_from(buffer)
+
+        self.s_hash_seed = tuple(hash_seed)
 
 
 class BlockGroupDescriptionInfo(_Parser):
+    __slots__ = (
+        "bg_block_bitmap",
+        "bg_inode_bitmap",
+        "bg_inode_table",
+        "bg_free_blocks_count",
+        "bg_free_inodes_count",
+        "bg_used_dirs_count",
+    )
+
     __size__ = 32
 
     def __init__(self, data: bytes):
         super().__init__(data, BlockGroupDescriptionInfo.__size__)
 
-        self.bg_block_bitmap = self.read_u()
-        self.bg_inode_bitmap = self.read_u()
-        self.bg_inode_table = self.read_u()
-        self.bg_free_blocks_count = self.read_s()
-        self.bg_free_inodes_count = self.read_s()
-        self.bg_used_dirs_count = self.read_s()
+        (
+            self.bg_block_bitmap,
+            self.bg_inode_bitmap,
+            self.bg_inode_table,
+            self.bg_free_blocks_count,
+            self.bg_free_inodes_count,
+            self.bg_used_dirs_count,
+        ) = _BLOCK_GROUP_DESCRIPTION_STRUCT.unpack_from(data)
 
 
 class InodeInfo(_Parser):
+    __slots__ = (
+        "i_mode",
+        "i_uid",
+        "i_size",
+        "i_atime",
+        "i_ctime",
+        "i_mtime",
+        "i_dtime",
+        "i_gid",
+        "i_links_count",
+        "i_blocks",
+        "i_flags",
+        "i_osd1",
+        "i_generation",
+        "i_file_acl",
+        "i_dir_acl",
+        "i_faddr",
+        "i_osd2",
+        "i_block",
+    )
+
     __size__ = 128
 
-    def __init__(self, data: bytes):
-        super().__init__(data, InodeInfo.__size__)
-
-        self.i_mode = self.read_s()
-        self.i_uid = self.read_s()
-        self.i_size = self.read_u()
-        self.i_atime = self.read_u()
-        self.i_mtime = self.read_u()
-        self.i_ctime = self.read_u()
-        self.i_dtime = self.read_u()
-        self.i_gid = self.read_s()
-        self.i_links_count = self.read_s()
-        self.i_blocks = self.read_u()
-        self.i_flags = self.read_u()
-        self.i_osd1 = self.read_u()
-        self.i_block = self.read_us(count=15)
-        self.i_generation = self.read_u()
-        self.i_file_acl = self.read_u()
-        self.i_dir_acl = self.read_u()
-        self.i_faddr = self.read_u()
-        self.i_osd2 = self.read_bs(count=12)
+    def __init__(self, data: Buffer, offset: int = 0):
+        super().__init__(data, InodeInfo.__size__, offset)
+
+        (
+            self.i_mode,
+            self.i_uid,
+            self.i_size,
+            self.i_atime,
+            self.i_ctime,
+            self.i_mtime,
+            self.i_dtime,
+            self.i_gid,
+            self.i_links_count,
+            self.i_blocks,
+            self.i_flags,
+            self.i_osd1,
+            i_block,
+            self.i_generation,
+            self.i_file_acl,
+            self.i_dir_acl,
+            self.i_faddr,
+            self.i_osd2,
+        ) = _INODE_STRUCT.unpack_from(data, offset)
+
+        # kept as a compact array of C ints rather than a tuple of python ints
+        self.i_block = array.array("I", i_block)
+        # the array is filled in native byte order, the block pointers are stored little-endian
+        if sys.byteorder == "big":
+            self.i_block.byteswap()